@@ -0,0 +1,324 @@
+"""
+Replays recorded provider callbacks against a running server to reproduce bursts
+(e.g. end-of-month storms) and measure how the callback path keeps up.
+
+Accepted inputs (any mix, one or more files):
+- Trace logs written by src/tracing/logger.py. Callbacks are recorded there as
+  "Callback received" entries when the server runs with PAYLINK_RECORD_CALLBACKS=true.
+  Other log entries are skipped.
+- JSON lines of {"path": ..., "payload": ..., "timestamp": ...}. timestamp is optional, and so
+  is path for STK Push results.
+- JSON lines or a JSON array of raw STK Push result payloads.
+
+C2B payloads need an explicit path: validation and confirmation payloads look alike, and
+replaying a validation as a confirmation would mark pending payments as paid. C2B requests
+are sent with ?token=<C2B_CALLBACK_TOKEN>, which the server requires.
+
+Examples:
+uv run callback_replay.py logs/paylink_trace.log --speed 10 --concurrency 50
+PAYLINK_PROFILING_TOKEN=... C2B_CALLBACK_TOKEN=... uv run callback_replay.py storm.jsonl --speed 0 --repeat 20 --profiling
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+
+
+def _decode_all(text: str) -> List[Any]:
+    """Decodes every JSON value in text, including several objects written on one line"""
+    decoder = json.JSONDecoder()
+    values = []
+    index = 0
+    while index < len(text):
+        if text[index].isspace():
+            index += 1
+            continue
+        try:
+            value, index = decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            # Skip the rest of a corrupt line
+            index = text.find("\n", index)
+            if index == -1:
+                break
+            continue
+        values.extend(value if isinstance(value, list) else [value])
+    return values
+
+
+def _default_path(payload: Any) -> str | None:
+    # STK results are wrapped in Body.stkCallback. C2B validation and confirmation payloads share
+    # the same fields, so they cannot be routed without a recorded path.
+    if isinstance(payload, dict) and "TransID" in payload:
+        return None
+    return "/mpesa/callback"
+
+
+def _parse_timestamp(value: Any) -> float | None:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, LOG_TIME_FORMAT).timestamp()
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                return None
+    return None
+
+
+def load_events(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Loads callbacks from recorded payload files and trace logs.
+
+    Returns:
+        List[Dict[str, Any]]: Events with "path", "payload" and "offset" (seconds after the first
+            recorded callback, or 0 when the source has no timestamps), sorted by offset.
+    """
+    events = []
+    skipped = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records = _decode_all(f.read())
+
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+
+            if "levelname" in record:
+                # Trace log entry, only recorded callbacks are replayable
+                if "payload" not in record:
+                    continue
+                timestamp = _parse_timestamp(record.get("asctime"))
+            elif "payload" in record:
+                timestamp = _parse_timestamp(record.get("timestamp"))
+            else:
+                record = {"payload": record}
+                timestamp = None
+
+            payload = record["payload"]
+            route = record.get("path") or _default_path(payload)
+            if route is None:
+                skipped += 1
+                continue
+
+            events.append({
+                "path": route,
+                "payload": payload,
+                "timestamp": timestamp,
+            })
+
+    if skipped:
+        print(f"Skipped {skipped} C2B payloads without a path (validation or confirmation)")
+
+    start = min((e["timestamp"] for e in events if e["timestamp"] is not None), default=None)
+    for event in events:
+        timestamp = event.pop("timestamp")
+        event["offset"] = 0.0 if timestamp is None or start is None else timestamp - start
+
+    events.sort(key=lambda e: e["offset"])
+    return events
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+async def replay(
+    base_url: str,
+    events: List[Dict[str, Any]],
+    speed: float,
+    concurrency: int,
+    repeat: int,
+    timeout: float,
+    c2b_token: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Sends the events to the server following their recorded schedule.
+
+    Args:
+        base_url (str): Server address, e.g. http://localhost:8050.
+        events (List[Dict[str, Any]]): Events from load_events().
+        speed (float): Speed multiplier for the recorded gaps. 0 sends as fast as concurrency allows.
+        concurrency (int): Maximum callbacks in flight.
+        repeat (int): Number of times to replay the recording back to back.
+        timeout (float): Per request timeout in seconds.
+        c2b_token (str | None): C2B_CALLBACK_TOKEN of the server, sent with C2B requests.
+
+    Returns:
+        Dict[str, Any]: Ack latency, error and dispatch lag statistics.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    dispatch_lags: List[float] = []
+    errors: Dict[str, int] = {}
+
+    span = (events[-1]["offset"] if events else 0.0) + 1.0
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    ) as client:
+
+        async def send(event: Dict[str, Any], due: float) -> None:
+            async with semaphore:
+                # How far behind the recorded schedule the callback went out
+                sent_at = time.perf_counter()
+                dispatch_lags.append(max(sent_at - due, 0.0))
+                try:
+                    params = {"token": c2b_token} if c2b_token and event["path"].startswith("/mpesa/c2b/") else None
+                    response = await client.post(event["path"], json=event["payload"], params=params)
+                    latencies.append(time.perf_counter() - sent_at)
+                    if response.status_code >= 400:
+                        key = f"HTTP {response.status_code}"
+                        errors[key] = errors.get(key, 0) + 1
+                except httpx.HTTPError as e:
+                    key = type(e).__name__
+                    errors[key] = errors.get(key, 0) + 1
+
+        start = time.perf_counter()
+        tasks = []
+        for round_no in range(repeat):
+            for event in events:
+                offset = 0.0 if speed <= 0 else (round_no * span + event["offset"]) / speed
+                due = start + offset
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(event, due)))
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    dispatch_lags.sort()
+    total = len(tasks)
+    failed = sum(errors.values())
+
+    return {
+        "sent": total,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "errors": errors,
+        "ack_latency": {
+            "p50": round(_percentile(latencies, 50), 4),
+            "p95": round(_percentile(latencies, 95), 4),
+            "p99": round(_percentile(latencies, 99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+        "dispatch_lag": {
+            "p95": round(_percentile(dispatch_lags, 95), 4),
+            "max": round(dispatch_lags[-1], 4) if dispatch_lags else 0.0,
+        },
+    }
+
+
+async def profiling_request(
+    base_url: str, token: str | None, method: str, path: str, body: Dict[str, Any] | None = None
+) -> Dict[str, Any] | None:
+    """Calls one of the server's /debug/profiling routes and returns the profiler status, or None on failure"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers) as client:
+        try:
+            response = await client.request(method, path, json=body)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Could not reach {path}: {e}")
+            return None
+
+
+async def start_loop_lag_window(base_url: str, token: str | None) -> Dict[str, Any] | None:
+    """
+    Makes sure the server measures event loop lag and starts a fresh max_loop_lag window.
+
+    Returns:
+        Dict[str, Any] | None: The profiler status before the replay, to restore afterwards.
+    """
+    previous = await profiling_request(base_url, token, "GET", "/debug/profiling")
+    if previous is None:
+        return None
+
+    if not previous["loop_lag"]:
+        # Keep whatever CPU sampling setting the operator had
+        await profiling_request(
+            base_url, token, "POST", "/debug/profiling",
+            {"enabled": True, "cpu": previous["cpu_sampling"], "loop_lag": True},
+        )
+
+    await profiling_request(base_url, token, "POST", "/debug/profiling/reset")
+    return previous
+
+
+async def restore_profiling(base_url: str, token: str | None, previous: Dict[str, Any]) -> None:
+    """Puts the server's profiler back in the state it had before the replay"""
+    if not previous["enabled"]:
+        await profiling_request(base_url, token, "POST", "/debug/profiling", {"enabled": False})
+    elif not previous["loop_lag"]:
+        await profiling_request(
+            base_url, token, "POST", "/debug/profiling",
+            {"enabled": True, "cpu": previous["cpu_sampling"], "loop_lag": False},
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay recorded callbacks against a running PayLink server")
+    parser.add_argument("sources", nargs="+", help="Recorded payload files or trace logs")
+    parser.add_argument("--url", default="http://localhost:8050", help="Server base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed multiplier, 0 for as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=20, help="Maximum callbacks in flight")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the recording this many times")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per request timeout in seconds")
+    parser.add_argument("--profiling", action="store_true", help="Report server event loop lag via /debug/profiling")
+    parser.add_argument(
+        "--profiling-token",
+        default=os.getenv("PAYLINK_PROFILING_TOKEN"),
+        help="PAYLINK_PROFILING_TOKEN of the server (defaults to the environment variable)",
+    )
+    parser.add_argument(
+        "--c2b-token",
+        default=os.getenv("C2B_CALLBACK_TOKEN"),
+        help="C2B_CALLBACK_TOKEN of the server, needed to replay C2B callbacks (defaults to the environment variable)",
+    )
+    args = parser.parse_args()
+
+    events = load_events(args.sources)
+    if not events:
+        print("No replayable callbacks found")
+        return
+
+    print(f"Replaying {len(events)} callbacks x{args.repeat} at speed {args.speed} to {args.url}")
+
+    previous = None
+    if args.profiling:
+        previous = await start_loop_lag_window(args.url, args.profiling_token)
+
+    try:
+        report = await replay(
+            args.url, events, args.speed, args.concurrency, args.repeat, args.timeout, args.c2b_token
+        )
+
+        if previous is not None:
+            # Callbacks are processed before they are acknowledged, so loop lag is the backlog the server built up
+            status = await profiling_request(args.url, args.profiling_token, "GET", "/debug/profiling")
+            report["server_max_loop_lag"] = status["max_loop_lag"] if status else None
+    finally:
+        if previous is not None:
+            await restore_profiling(args.url, args.profiling_token, previous)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
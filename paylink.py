@@ -1,6 +1,5 @@
 import os
-import time
-import asyncio
+import hmac
 import json
 import logging
 from contextlib import asynccontextmanager
@@ -11,9 +10,10 @@ from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.responses import JSONResponse, RedirectResponse, Response
 
-from src.servers.mpesa.utils.auth import get_access_token, refresh_access_token
-from src.servers.mpesa.models.context import MPesaContext
-from src.servers.mpesa.tools.mpesa_tools import MpesaTools
+from src.servers.provider import PayLinkContext
+from src.servers.registry import ProviderRegistry
+from src.tracing.profiling import profiler
+from src.tracing.callback_log import record_callback
 
 
 logger = logging.getLogger(__name__)
@@ -21,35 +21,26 @@ logger = logging.getLogger(__name__)
 # Load env
 load_dotenv(override=True)
 
+# Only providers listed in PAYLINK_PROVIDERS are imported
+registry = ProviderRegistry()
+
 
 # Define the application lifespan context manager
 # This handles setup and teardown logic for the app's lifecycle
 @asynccontextmanager
-async def app_lifespan(app: FastMCP) -> AsyncIterator[MPesaContext]:
+async def app_lifespan(app: FastMCP) -> AsyncIterator[PayLinkContext]:
+    context = PayLinkContext()
     try:
-        # Fetch initial access token from Safaricom API
-        token_data = await get_access_token()
-
-        # Create and store context containing the token and expiry info
-        context = MPesaContext(
-            access_token=token_data["access_token"],
-            expires_at=time.time() + token_data["expires_in"],
-            refresh_task=None,
-        )
-
-        # Start a background task to refresh the token before it expires
-        context.refresh_task = asyncio.create_task(refresh_access_token(context))
+        # Authenticate every enabled provider and keep its context for the tools
+        for key, provider in registry.items():
+            context.providers[key] = await provider.start()
 
         # Yield the context to the server for use in tools
         yield context
     finally:
-        # On shutdown, cancel the token refresh task gracefully
-        if context.refresh_task:
-            context.refresh_task.cancel()
-            try:
-                await context.refresh_task
-            except asyncio.CancelledError:
-                pass
+        # On shutdown, let each started provider release its resources
+        for key, provider_context in context.providers.items():
+            await registry.get(key).stop(provider_context)
 
 
 # Create an instance of the MCP server with a lifespan context
@@ -61,40 +52,106 @@ mcp = FastMCP(
     stateless_http=True
 )
 
-@mcp.custom_route("/mpesa/callback", methods=["POST"])
-async def mpesa_callback_handler(request: Request) -> Response:
+@mcp.custom_route("/{provider}/callback", methods=["POST"])
+async def callback_handler(request: Request) -> Response:
     """
-    TODO: Super callback
-        pass the request and the provider
-    Handle M-Pesa webhook callback.
-    
-    
+    Handle webhook callbacks for every provider.
+
+    The provider is taken from the path (e.g. /mpesa/callback) and the payload is
+    handed to that provider's callback parser.
     """
-    
-    
+    provider = registry.get(request.path_params["provider"])
+    if provider is None:
+        return Response(status_code=404, content="Unknown provider")
+
     try:
         # Read the request body (asynchronous)
         body = await request.body()
-        logger.info(f"Received M-Pesa webhook: {body}")
+        logger.info(f"Received {provider.key} webhook: {body}")
 
-        # Parse the JSON payload (M-Pesa sends JSON data)
+        # Parse the JSON payload and normalize it with the provider's parser
         payload = json.loads(body.decode("utf-8"))
-        
-        # Process the M-Pesa payload (add your logic here)
-        # Example: Log the transaction details
-        logger.info(f"M-Pesa Payload: {payload}")
+        record_callback(request.url.path, payload)
+        callback = provider.parse_callback(payload)
+
+        logger.info(f"{provider.key} callback: {callback}")
 
         # Return a 200 OK response to acknowledge receipt
         return Response(status_code=200, content="Webhook received successfully")
-    
+
+    except ValueError as e:
+        # Payloads that cannot be decoded or parsed will fail the same way on every retry,
+        # so they are acknowledged instead of making the provider resend them
+        logger.warning(f"Unparseable {provider.key} webhook: {e}")
+        return Response(status_code=200, content="Webhook received successfully")
+
     except Exception as e:
         # Log the error for debugging
         logger.error(f"Unexpected error: {e}")
-        # Return a 500 error response to M-Pesa
+        # Return a 500 error response to the provider
         return Response(status_code=500, content=f"Error processing webhook: {str(e)}")
 
 
-MpesaTools(mcp=mcp)
+def check_profiling_token(request: Request) -> Response | None:
+    """
+    Returns an error response unless the request carries "Authorization: Bearer <PAYLINK_PROFILING_TOKEN>".
+
+    The profiling routes are hidden (404) unless that variable is set, since the server is reachable
+    from the internet.
+    """
+    token = os.getenv("PAYLINK_PROFILING_TOKEN")
+    if not token:
+        return Response(status_code=404, content="Not Found")
+    authorization = request.headers.get("authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return Response(status_code=401, content="Unauthorized")
+    return None
+
+
+@mcp.custom_route("/debug/profiling", methods=["GET", "POST"])
+async def profiling_handler(request: Request) -> Response:
+    """
+    Show or toggle profiling at runtime.
+
+    GET returns the profiler status and the most recent tool profiles.
+    POST with {"enabled": true, "cpu": true, "loop_lag": true} turns it on, {"enabled": false} off.
+    """
+    error = check_profiling_token(request)
+    if error is not None:
+        return error
+
+    if request.method == "POST":
+        try:
+            options = json.loads(await request.body() or b"{}")
+        except json.JSONDecodeError:
+            return Response(status_code=400, content="Invalid JSON body")
+
+        if options.get("enabled", True):
+            profiler.enable(
+                cpu=options.get("cpu", True),
+                loop_lag=options.get("loop_lag", True),
+            )
+        else:
+            profiler.disable()
+
+    return JSONResponse(profiler.status())
+
+
+@mcp.custom_route("/debug/profiling/reset", methods=["POST"])
+async def profiling_reset_handler(request: Request) -> Response:
+    """
+    Reset the max event loop lag so the next status covers only what happens from now on.
+    """
+    error = check_profiling_token(request)
+    if error is not None:
+        return error
+
+    profiler.reset_loop_lag()
+    return JSONResponse(profiler.status())
+
+
+registry.register_routes(mcp)
+registry.register_tools(mcp)
 
 # Entry point to start the MCP server
 if __name__ == "__main__":
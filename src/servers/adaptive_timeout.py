@@ -0,0 +1,174 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict
+
+import httpx
+
+from src.tracing.profiling import span
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveTimeout:
+    """
+    Tracks upstream latency per endpoint and derives request deadlines from it.
+
+    Only idempotent calls get adaptive deadlines. Until an endpoint has min_samples
+    observations the default timeout is used, after that the deadline is
+    p99 * multiplier, clamped to [floor, ceiling]. Non-idempotent calls (e.g. STK
+    push) always use the default timeout, since timing out a request the upstream
+    accepted invites a retry that charges the customer twice. The default matches
+    httpx's own 5 second timeout, which these calls used before.
+
+    Idempotent calls are also hedged: if the first attempt is still running once
+    the endpoint's p95 has elapsed a second identical request is sent, the first
+    successful (2xx) response wins and the other attempt is cancelled. Error
+    responses only win when no other attempt is left. Hedges are capped at
+    hedge_budget of the endpoint's requests so upstream load stays bounded.
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 20,
+        default_timeout: float = 5.0,
+        multiplier: float = 2.0,
+        floor: float = 2.0,
+        ceiling: float = 60.0,
+        hedge_budget: float = 0.1,
+    ) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self.default_timeout = default_timeout
+        self.multiplier = multiplier
+        self.floor = floor
+        self.ceiling = ceiling
+        self.hedge_budget = hedge_budget
+
+        self._samples: Dict[str, Deque[float]] = {}
+        self._requests: Dict[str, int] = {}
+        self._hedges: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        """Records the latency of a completed call to endpoint"""
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = self._samples[endpoint] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, endpoint: str, q: float) -> float | None:
+        """Returns the q-th percentile (0-100) latency of endpoint, or None without enough samples"""
+        samples = self._samples.get(endpoint)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+
+        ordered = sorted(samples)
+        index = min(int(len(ordered) * q / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def timeout_for(self, endpoint: str) -> float:
+        """Returns the deadline in seconds for the next call to endpoint"""
+        p99 = self.percentile(endpoint, 99)
+        if p99 is None:
+            return self.default_timeout
+        return min(max(p99 * self.multiplier, self.floor), self.ceiling)
+
+    def _can_hedge(self, endpoint: str) -> bool:
+        requests = self._requests.get(endpoint, 0)
+        return self._hedges.get(endpoint, 0) < requests * self.hedge_budget
+
+    async def _attempt(
+        self, client: httpx.AsyncClient, method: str, url: str, endpoint: str, timeout: float, **kwargs
+    ) -> httpx.Response:
+        start_time = time.perf_counter()
+        try:
+            response = await client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.TimeoutException:
+            # Count the timeout as a slow sample so the deadline can grow
+            self.record(endpoint, timeout)
+            raise
+        except asyncio.CancelledError:
+            # A hedged attempt that lost is the slow tail; its elapsed time is a lower bound
+            self.record(endpoint, time.perf_counter() - start_time)
+            raise
+        self.record(endpoint, time.perf_counter() - start_time)
+        return response
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        endpoint: str,
+        idempotent: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Sends a request, with an adaptive deadline and hedging when it is idempotent.
+
+        Args:
+            client (httpx.AsyncClient): Client used for every attempt.
+            method (str): HTTP method.
+            url (str): Request URL.
+            endpoint (str): Key under which latency is tracked (e.g. "stkpushquery").
+            idempotent (bool): Whether the call can safely be sent twice. Enables the adaptive
+                deadline and hedging; otherwise the default timeout is used.
+            **kwargs: Passed through to httpx.AsyncClient.request.
+
+        Returns:
+            httpx.Response: The first response received.
+        """
+        with span("upstream"):
+            return await self._request(client, method, url, endpoint, idempotent, **kwargs)
+
+    async def _request(
+        self, client: httpx.AsyncClient, method: str, url: str, endpoint: str, idempotent: bool, **kwargs
+    ) -> httpx.Response:
+        if not idempotent:
+            return await self._attempt(client, method, url, endpoint, self.default_timeout, **kwargs)
+
+        timeout = self.timeout_for(endpoint)
+        self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+
+        hedge_delay = self.percentile(endpoint, 95)
+        if hedge_delay is None:
+            return await self._attempt(client, method, url, endpoint, timeout, **kwargs)
+
+        attempts = [asyncio.create_task(self._attempt(client, method, url, endpoint, timeout, **kwargs))]
+        try:
+            done, pending = await asyncio.wait(attempts, timeout=hedge_delay)
+            if done or not self._can_hedge(endpoint):
+                return await attempts[0]
+
+            self._hedges[endpoint] = self._hedges.get(endpoint, 0) + 1
+            logger.info(f"Hedging {endpoint} request after {hedge_delay:.3f}s")
+            attempts.append(
+                asyncio.create_task(self._attempt(client, method, url, endpoint, timeout, **kwargs))
+            )
+
+            pending = set(attempts)
+            failed = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().is_success:
+                        return task.result()
+                    failed.append(task)
+
+            # Every attempt failed: prefer an error response over an exception
+            for task in failed:
+                if task.exception() is None:
+                    return task.result()
+            return failed[0].result()
+        finally:
+            # Cancel any attempt still running (also when the caller is cancelled) and let it
+            # unwind before the caller goes on to use or close the client
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+
+# Shared by all Daraja calls
+adaptive_timeout = AdaptiveTimeout()
@@ -1,6 +1,7 @@
 import os
 from typing import Dict, Any
 from src.tracing.async_trace import async_trace
+from src.servers.mpesa.core.c2b.payment_matcher import payment_matcher
 
 @async_trace
 async def initiate_c2b_payment(
@@ -10,6 +11,8 @@ async def initiate_c2b_payment(
     """
     Generates M-Pesa Paybill payment instructions for a customer to pay manually.
 
+    The payment is registered as expected so that the C2B confirmation can be matched to it.
+
     Args:
         amount (int): Amount to be paid in KES.
         account_number (str): Reference number identifying the transaction (e.g., order ID, invoice number).
@@ -24,6 +27,8 @@ async def initiate_c2b_payment(
         f"Enter {shortcode} > Account: {account_number} > Amount: {amount}"
     )
 
+    payment_matcher.expect(account_number, amount)
+
     return {
         "shortcode": shortcode,
         "pay_with": "M-Pesa Paybill",
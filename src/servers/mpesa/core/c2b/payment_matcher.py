@@ -0,0 +1,167 @@
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict
+from typing import Any, Deque, Dict, List, Tuple
+
+from src.servers.mpesa.models.c2b_payment import C2BPayment
+
+
+class C2BPaymentMatcher:
+    """
+    Matches C2B confirmations against expected payments in memory.
+
+    Pending payments are indexed by (account_number, amount) so a confirmation
+    is matched with a single dict lookup. Payments with the same key are matched
+    first in, first out. Confirmations are deduplicated by TransID, so a
+    redelivered confirmation returns the payment it already matched.
+
+    Memory is bounded: only the most recent max_accounts account numbers are
+    kept, older ones are evicted together with their payments, and each account
+    keeps at most max_payments_per_account payments, dropping settled (paid or
+    unmatched) ones first.
+    """
+
+    def __init__(self, max_accounts: int = 10000, max_payments_per_account: int = 100) -> None:
+        self.max_accounts = max_accounts
+        self.max_payments_per_account = max_payments_per_account
+        self._pending: Dict[Tuple[str, float], Deque[C2BPayment]] = {}
+        self._by_account: OrderedDict[str, List[C2BPayment]] = OrderedDict()
+        self._by_trans_id: Dict[str, C2BPayment] = {}
+
+    @staticmethod
+    def _normalize(account_number: str, amount: Any) -> Tuple[str, float]:
+        # M-Pesa sends TransAmount as a string (e.g. "10.00") and BillRefNumber as typed by the customer
+        return str(account_number).strip().upper(), round(float(amount), 2)
+
+    def _forget(self, payment: C2BPayment) -> None:
+        # Removes a payment from the TransID and pending indexes
+        if payment.trans_id is not None:
+            self._by_trans_id.pop(payment.trans_id, None)
+        if payment.status == "pending":
+            key = (payment.account_number, payment.amount)
+            self._pending[key].remove(payment)
+            if not self._pending[key]:
+                del self._pending[key]
+
+    def _track(self, payment: C2BPayment) -> None:
+        payments = self._by_account.get(payment.account_number)
+        if payments is None:
+            payments = self._by_account[payment.account_number] = []
+        else:
+            self._by_account.move_to_end(payment.account_number)
+        payments.append(payment)
+
+        if len(payments) > self.max_payments_per_account:
+            oldest = next((p for p in payments if p.status != "pending"), payments[0])
+            payments.remove(oldest)
+            self._forget(oldest)
+
+        while len(self._by_account) > self.max_accounts:
+            _, evicted = self._by_account.popitem(last=False)
+            for old in evicted:
+                self._forget(old)
+
+    def expect(self, account_number: str, amount: Any) -> C2BPayment:
+        """Registers a payment the server is waiting for"""
+        account_number, amount = self._normalize(account_number, amount)
+        payment = C2BPayment(
+            account_number=account_number,
+            amount=amount,
+            status="pending",
+            created_at=time.time(),
+        )
+        self._pending.setdefault((account_number, amount), deque()).append(payment)
+        self._track(payment)
+        return payment
+
+    def is_expected(self, account_number: str, amount: Any) -> bool:
+        """Checks whether a payment with this account number and amount is pending"""
+        return self._normalize(account_number, amount) in self._pending
+
+    def is_expected_account(self, account_number: str) -> bool:
+        """Checks whether any payment is pending for this account number, whatever the amount"""
+        account_number = self._normalize(account_number, 0)[0]
+        return any(p.status == "pending" for p in self._by_account.get(account_number, []))
+
+    def confirm(
+        self,
+        account_number: str,
+        amount: Any,
+        trans_id: str | None = None,
+        msisdn: str | None = None,
+        trans_time: str | None = None,
+    ) -> C2BPayment:
+        """
+        Records a confirmed payment and matches it to the oldest pending payment with the same key.
+
+        Returns:
+            C2BPayment: The matched payment, or a new "unmatched" record if nothing was expected.
+                A repeated TransID returns the payment recorded for it the first time.
+        """
+        if trans_id is not None and trans_id in self._by_trans_id:
+            return self._by_trans_id[trans_id]
+
+        key = self._normalize(account_number, amount)
+        pending = self._pending.get(key)
+
+        if pending:
+            payment = pending.popleft()
+            if not pending:
+                del self._pending[key]
+            payment.status = "paid"
+        else:
+            payment = C2BPayment(
+                account_number=key[0],
+                amount=key[1],
+                status="unmatched",
+                created_at=time.time(),
+            )
+            self._track(payment)
+
+        payment.trans_id = trans_id
+        payment.msisdn = msisdn
+        payment.trans_time = trans_time
+        payment.paid_at = time.time()
+        if trans_id is not None:
+            self._by_trans_id[trans_id] = payment
+        return payment
+
+    def status(self, account_number: str, amount: Any | None = None) -> Dict[str, Any]:
+        """
+        Reports every known payment for an account number, optionally filtered by amount.
+
+        Returns:
+            Dict[str, Any]: Overall status, the number of payments per status and the payments.
+                The status is "pending" while any payment is still outstanding (e.g. instalments),
+                then "paid", "unmatched" or "unknown".
+        """
+        if amount is None:
+            account_number = self._normalize(account_number, 0)[0]
+        else:
+            account_number, amount = self._normalize(account_number, amount)
+
+        payments = [
+            p for p in self._by_account.get(account_number, [])
+            if amount is None or p.amount == amount
+        ]
+
+        counts: Dict[str, int] = {}
+        for p in payments:
+            counts[p.status] = counts.get(p.status, 0) + 1
+
+        for status in ("pending", "paid", "unmatched"):
+            if status in counts:
+                break
+        else:
+            status = "unknown"
+
+        return {
+            "account_number": account_number,
+            "status": status,
+            "counts": counts,
+            "payments": [asdict(p) for p in payments],
+        }
+
+
+# Shared by the C2B tools and the confirmation/validation routes
+payment_matcher = C2BPaymentMatcher()
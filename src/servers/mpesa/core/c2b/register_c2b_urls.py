@@ -0,0 +1,67 @@
+import os
+import httpx
+from typing import Dict, Any
+from src.tracing.async_trace import async_trace
+from src.servers.adaptive_timeout import adaptive_timeout
+
+@async_trace
+async def register_c2b_urls(
+    client: httpx.AsyncClient,
+    access_token: str,
+    response_type: str = "Completed",
+) -> Dict[str, Any]:
+    """
+    Registers the C2B confirmation and validation URLs for the business shortcode.
+
+    M-Pesa calls the validation URL before completing a Paybill payment (only if external
+    validation is enabled for the shortcode) and the confirmation URL once it completes.
+
+    Args:
+        client (httpx.AsyncClient): The M-Pesa provider's shared HTTP client.
+        access_token (str): OAuth access token for M-Pesa API.
+        response_type (str): What M-Pesa does if the validation URL is unreachable: "Completed" or "Cancelled".
+
+    Returns:
+        Dict[str, Any]: The registration response from M-Pesa, or an error message.
+    """
+    business_shortcode = os.getenv("BUSINESS_SHORTCODE")
+    confirmation_url = os.getenv("C2B_CONFIRMATION_URL")
+    validation_url = os.getenv("C2B_VALIDATION_URL")
+    base_url = os.getenv("BASE_URL")
+
+    callback_token = os.getenv("C2B_CALLBACK_TOKEN")
+
+    if not all([business_shortcode, confirmation_url, validation_url, base_url, callback_token]):
+        return {"error": "Missing M-Pesa C2B environment variables"}
+
+    # The C2B routes reject requests without the token, so it has to be part of the registered URLs
+    if any(f"token={callback_token}" not in url for url in (confirmation_url, validation_url)):
+        return {"error": "C2B_CONFIRMATION_URL and C2B_VALIDATION_URL must include ?token=<C2B_CALLBACK_TOKEN>"}
+
+    if response_type not in {"Completed", "Cancelled"}:
+        return {"error": "Response type must be Completed or Cancelled"}
+
+    payload = {
+        "ShortCode": business_shortcode,
+        "ResponseType": response_type,
+        "ConfirmationURL": confirmation_url,
+        "ValidationURL": validation_url,
+    }
+
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json",
+    }
+
+    url = f"{base_url}/mpesa/c2b/v1/registerurl"
+
+    try:
+        response = await adaptive_timeout.request(
+            client, "POST", url, "c2b_registerurl", json=payload, headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        return {"error": "HTTP Error", "details": e.response.text}
+    except Exception as e:
+        return {"error": f"C2B URL registration failed: {e}"}
@@ -0,0 +1,43 @@
+from typing import Dict, Any
+
+
+def parse_stk_callback(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flattens an M-Pesa STK Push result callback.
+
+    Args:
+        payload (Dict[str, Any]): Raw callback body, shaped as {"Body": {"stkCallback": {...}}}.
+
+    Raises:
+        ValueError: If the payload is not shaped like an STK Push callback.
+
+    Returns:
+        Dict[str, Any]: Callback fields with the CallbackMetadata items lifted to top level keys
+            (Amount, MpesaReceiptNumber, TransactionDate, PhoneNumber).
+    """
+    # Anything not shaped like an STK callback raises ValueError, which the callback route acknowledges
+    body = payload.get("Body") if isinstance(payload, dict) else None
+    callback = body.get("stkCallback") if isinstance(body, dict) else None
+    if not isinstance(callback, dict):
+        raise ValueError("Not an STK Push callback")
+
+    parsed = {
+        "type": "stk_push",
+        "merchant_request_id": callback.get("MerchantRequestID"),
+        "checkout_request_id": callback.get("CheckoutRequestID"),
+        "result_code": callback.get("ResultCode"),
+        "result_desc": callback.get("ResultDesc"),
+    }
+
+    # Metadata is only present on successful payments
+    metadata = callback.get("CallbackMetadata") or {}
+    items = metadata.get("Item", []) if isinstance(metadata, dict) else None
+    if not isinstance(items, list):
+        raise ValueError("Invalid STK Push callback metadata")
+
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("Name"), str):
+            raise ValueError("Invalid STK Push callback metadata item")
+        parsed[item["Name"]] = item.get("Value")
+
+    return parsed
@@ -3,8 +3,10 @@ import time
 import base64
 import httpx
 from typing import Dict, Any
+from src.servers.adaptive_timeout import adaptive_timeout
 
 async def query_stk_push_status(
+    client: httpx.AsyncClient,
     access_token: str,
     checkout_request_id: str
 ) -> Dict[str, Any]:
@@ -12,6 +14,7 @@ async def query_stk_push_status(
     Queries the status of a previously initiated M-Pesa STK Push transaction.
 
     Args:
+        client (httpx.AsyncClient): The M-Pesa provider's shared HTTP client.
         access_token (str): OAuth access token for M-Pesa API.
         checkout_request_id (str): Unique CheckoutRequestID received after initiating STK push.
 
@@ -45,12 +48,13 @@ async def query_stk_push_status(
 
     url = f"{base_url}/mpesa/stkpushquery/v1/query"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            return {"error": "HTTP Error", "details": e.response.text}
-        except Exception as e:
-            return {"error": f"Query failed: {e}"}
+    try:
+        response = await adaptive_timeout.request(
+            client, "POST", url, "stkpushquery", idempotent=True, json=payload, headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        return {"error": "HTTP Error", "details": e.response.text}
+    except Exception as e:
+        return {"error": f"Query failed: {e}"}
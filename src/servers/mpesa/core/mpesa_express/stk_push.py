@@ -4,9 +4,12 @@ import httpx
 import base64
 from typing import Dict, Any
 from src.tracing.async_trace import async_trace
+from src.tracing.profiling import span
+from src.servers.adaptive_timeout import adaptive_timeout
 
 @async_trace
 async def initiate_stk_push(
+    client: httpx.AsyncClient,
     access_token: str,
     phone_number: str,
     amount: int,
@@ -21,6 +24,8 @@ async def initiate_stk_push(
     The customer receives a prompt on their phone to enter their M-Pesa PIN to authorize and complete the payment.
 
     Args:
+        client (httpx.AsyncClient): The M-Pesa provider's shared HTTP client.
+        access_token (str): OAuth access token for M-Pesa API.
         phone_number (str): The mobile number to which the STK Push prompt will be sent (should be an M-Pesa registered number).
         amount (int): The amount to be paid, in integer value.
         account_reference (str): A reference string for the account being charged, displayed to the customer in the STK prompt.
@@ -36,24 +41,25 @@ async def initiate_stk_push(
     callback_url = os.getenv("CALLBACK_URL")
     base_url = os.getenv("BASE_URL")
 
-    if not all([business_shortcode, passkey, callback_url, base_url]):
-        return {"error": "Missing M-Pesa STK environment variables"}
+    with span("validation"):
+        if not all([business_shortcode, passkey, callback_url, base_url]):
+            return {"error": "Missing M-Pesa STK environment variables"}
 
-    if not phone_number.startswith("254") or len(phone_number) != 12:
-        return {"error": "Invalid phone number format. Must be 254XXXXXXXXX"}
+        if not phone_number.startswith("254") or len(phone_number) != 12:
+            return {"error": "Invalid phone number format. Must be 254XXXXXXXXX"}
 
-    if len(account_reference) > 12:
-        return {"error": "Account reference must be ≤ 12 characters"}
+        if len(account_reference) > 12:
+            return {"error": "Account reference must be ≤ 12 characters"}
 
-    if len(transaction_desc) > 13:
-        return {"error": "Transaction description must be ≤ 13 characters"}
+        if len(transaction_desc) > 13:
+            return {"error": "Transaction description must be ≤ 13 characters"}
 
-    VALID_TRANSACTION_TYPES = {"CustomerPayBillOnline", "CustomerBuyGoodsOnline"}
+        VALID_TRANSACTION_TYPES = {"CustomerPayBillOnline", "CustomerBuyGoodsOnline"}
 
-    if transaction_type not in VALID_TRANSACTION_TYPES:
-        return {
-            "error": f"Invalid transaction type {', '.join(VALID_TRANSACTION_TYPES)}"
-        }
+        if transaction_type not in VALID_TRANSACTION_TYPES:
+            return {
+                "error": f"Invalid transaction type {', '.join(VALID_TRANSACTION_TYPES)}"
+            }
 
     timestamp = time.strftime("%Y%m%d%H%M%S")
     password = base64.b64encode(
@@ -81,12 +87,13 @@ async def initiate_stk_push(
 
     url = f"{base_url}/mpesa/stkpush/v1/processrequest"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            return {"error": "HTTP Error", "details": e.response.text}
-        except Exception as e:
-            return {"error": f"STK Push failed: {e}"}
+    try:
+        response = await adaptive_timeout.request(
+            client, "POST", url, "stkpush", json=payload, headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        return {"error": "HTTP Error", "details": e.response.text}
+    except Exception as e:
+        return {"error": f"STK Push failed: {e}"}
@@ -1,8 +1,9 @@
 import os
 import httpx
 from typing import Dict
+from src.servers.adaptive_timeout import adaptive_timeout
 
-async def generate_dynamic_qr(access_token: str, payload: Dict) -> Dict:
+async def generate_dynamic_qr(client: httpx.AsyncClient, access_token: str, payload: Dict) -> Dict:
     base_url = os.getenv("BASE_URL")
     url = f"{base_url}/mpesa/qrcode/v1/generate"
 
@@ -11,7 +12,8 @@ async def generate_dynamic_qr(access_token: str, payload: Dict) -> Dict:
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()
+    response = await adaptive_timeout.request(
+        client, "POST", url, "qrcode", headers=headers, json=payload
+    )
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class C2BPayment:
+    """A C2B Paybill payment, either expected by the server or reported by M-Pesa"""
+    account_number: str
+    amount: float
+    status: str  # "pending", "paid" or "unmatched"
+    created_at: float
+    trans_id: str | None = None
+    msisdn: str | None = None
+    trans_time: str | None = None
+    paid_at: float | None = None
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 import asyncio
+import httpx
 
 @dataclass
 class MPesaContext:
@@ -7,3 +8,4 @@ class MPesaContext:
     access_token: str
     expires_at: float
     refresh_task: asyncio.Task | None
+    client: httpx.AsyncClient
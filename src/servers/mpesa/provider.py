@@ -0,0 +1,56 @@
+import time
+import asyncio
+from typing import Dict, Any
+
+from src.servers.provider import PaymentProvider
+from src.servers.mpesa.models.context import MPesaContext
+from src.servers.mpesa.utils.auth import get_access_token, refresh_access_token
+from src.servers.mpesa.core.callbacks.parse_stk_callback import parse_stk_callback
+
+
+class MpesaProvider(PaymentProvider):
+    """Safaricom M-Pesa (Daraja API) provider"""
+
+    key = "mpesa"
+
+    def register_tools(self, mcp) -> None:
+        from src.servers.mpesa.tools.mpesa_tools import MpesaTools
+
+        MpesaTools(mcp=mcp)
+
+    def register_routes(self, mcp) -> None:
+        from src.servers.mpesa.routes.mpesa_routes import MpesaRoutes
+
+        MpesaRoutes(mcp=mcp)
+
+    async def authenticate(self) -> MPesaContext:
+        # Fetch initial access token from Safaricom API
+        token_data = await get_access_token(self.client)
+
+        return MPesaContext(
+            access_token=token_data["access_token"],
+            expires_at=time.time() + token_data["expires_in"],
+            refresh_task=None,
+            client=self.client,
+        )
+
+    async def start(self) -> MPesaContext:
+        context = await super().start()
+
+        # Start a background task to refresh the token before it expires
+        context.refresh_task = asyncio.create_task(refresh_access_token(context))
+        return context
+
+    async def stop(self, context: MPesaContext) -> None:
+        # Cancel the token refresh task gracefully
+        if context is not None and context.refresh_task:
+            context.refresh_task.cancel()
+            try:
+                await context.refresh_task
+            except asyncio.CancelledError:
+                pass
+
+        await super().stop(context)
+
+    def parse_callback(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return parse_stk_callback(payload)
@@ -0,0 +1,118 @@
+import os
+import hmac
+import json
+import logging
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from src.servers.mpesa.core.c2b.payment_matcher import payment_matcher
+from src.tracing.callback_log import record_callback
+
+logger = logging.getLogger(__name__)
+
+
+class MpesaRoutes:
+    def __init__(self, mcp) -> None:
+        """
+        Initializes the MpesaRoutes class and registers the M-Pesa specific HTTP routes.
+
+        Args:
+            mcp: The MCP server instance to register the routes with.
+        """
+        self.mcp = mcp
+
+        # Reject payments nobody asked for instead of accepting every Paybill payment
+        self.strict_validation = os.getenv("C2B_STRICT_VALIDATION", "false").lower() == "true"
+
+        # The C2B routes are reachable from the internet and a confirmation marks money as received,
+        # so they only accept requests carrying the secret registered in C2B_CONFIRMATION_URL and
+        # C2B_VALIDATION_URL (?token=...), optionally restricted to Safaricom's source IPs.
+        self.callback_token = os.getenv("C2B_CALLBACK_TOKEN")
+        self.allowed_ips = {ip.strip() for ip in os.getenv("C2B_ALLOWED_IPS", "").split(",") if ip.strip()}
+        if not self.callback_token:
+            logger.warning("C2B_CALLBACK_TOKEN is not set, C2B confirmation and validation requests are rejected")
+
+        self.register_routes()
+
+    def is_authorized(self, request: Request) -> bool:
+        """
+        Checks that a C2B request carries the callback token and comes from an allowed IP.
+
+        Args:
+            request (Request): The incoming C2B confirmation or validation request.
+
+        Returns:
+            bool: True if the request may reach the payment matcher.
+        """
+        if not self.callback_token:
+            return False
+
+        token = request.query_params.get("token", "")
+        if not hmac.compare_digest(token.encode(), self.callback_token.encode()):
+            return False
+
+        if self.allowed_ips and (request.client is None or request.client.host not in self.allowed_ips):
+            return False
+
+        return True
+
+    def register_routes(self):
+        """
+        Registers available routes
+        """
+
+        # C2B VALIDATION
+        @self.mcp.custom_route("/mpesa/c2b/validation", methods=["POST"])
+        async def c2b_validation_handler(request: Request) -> JSONResponse:
+            """
+            Accepts or rejects a C2B payment before M-Pesa completes it.
+            """
+            if not self.is_authorized(request):
+                logger.warning(f"Rejected unauthorized C2B validation from {request.client}")
+                return Response(status_code=403, content="Forbidden")
+
+            try:
+                payload = json.loads(await request.body())
+                record_callback(request.url.path, payload)
+
+                if self.strict_validation and not payment_matcher.is_expected(
+                    payload["BillRefNumber"], payload["TransAmount"]
+                ):
+                    if payment_matcher.is_expected_account(payload["BillRefNumber"]):
+                        # C2B00013: Invalid Amount
+                        return JSONResponse({"ResultCode": "C2B00013", "ResultDesc": "Rejected"})
+                    # C2B00012: Invalid Account Number
+                    return JSONResponse({"ResultCode": "C2B00012", "ResultDesc": "Rejected"})
+
+                return JSONResponse({"ResultCode": "0", "ResultDesc": "Accepted"})
+            except Exception as e:
+                logger.error(f"C2B validation failed: {e}")
+                # C2B00016: Other Error
+                return JSONResponse({"ResultCode": "C2B00016", "ResultDesc": "Rejected"})
+
+        # C2B CONFIRMATION
+        @self.mcp.custom_route("/mpesa/c2b/confirmation", methods=["POST"])
+        async def c2b_confirmation_handler(request: Request) -> JSONResponse:
+            """
+            Records a completed C2B payment and matches it to the expected payment.
+            """
+            if not self.is_authorized(request):
+                logger.warning(f"Rejected unauthorized C2B confirmation from {request.client}")
+                return Response(status_code=403, content="Forbidden")
+
+            try:
+                payload = json.loads(await request.body())
+                record_callback(request.url.path, payload)
+
+                payment = payment_matcher.confirm(
+                    payload["BillRefNumber"],
+                    payload["TransAmount"],
+                    trans_id=payload.get("TransID"),
+                    msisdn=payload.get("MSISDN"),
+                    trans_time=payload.get("TransTime"),
+                )
+                logger.info(f"C2B payment {payment.trans_id} for {payment.account_number}: {payment.status}")
+            except Exception as e:
+                # The payment has already completed, so M-Pesa is acknowledged either way
+                logger.error(f"C2B confirmation failed: {e}")
+
+            return JSONResponse({"ResultCode": 0, "ResultDesc": "Success"})
@@ -2,12 +2,16 @@ import json
 from typing import Dict, Any
 from mcp.server.fastmcp import Context
 from src.servers.mpesa.models.context import MPesaContext
+from src.servers.mpesa.provider import MpesaProvider
 from src.servers.mpesa.core.mpesa_express.stk_push import initiate_stk_push
 from src.servers.mpesa.core.mpesa_express.query_stk_push_status import (
     query_stk_push_status,
 )
 from src.servers.mpesa.core.mpesa_qr.generate_dynamic_qr import generate_dynamic_qr
 from src.servers.mpesa.core.c2b.initiate_c2b_payment import initiate_c2b_payment
+from src.servers.mpesa.core.c2b.register_c2b_urls import register_c2b_urls
+from src.servers.mpesa.core.c2b.payment_matcher import payment_matcher
+from src.tracing.profiling import profile_tool, span
 
 
 class MpesaTools:
@@ -32,6 +36,7 @@ class MpesaTools:
 
         # STK PUSH TOOL
         @self.mcp.tool()
+        @profile_tool
         async def stk_push(
             ctx: Context,
             phone_number: str,
@@ -59,12 +64,13 @@ class MpesaTools:
             """
             try:
                 # Access the M-Pesa context (which includes necessary details like access token)
-                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context
+                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context.providers[MpesaProvider.key]
                 
                 print("Initiating STK push...")
 
                 # Call the function that initiates the STK push and get the response
                 response = await initiate_stk_push(
+                    mpesa_ctx.client,
                     mpesa_ctx.access_token,
                     phone_number,
                     amount,
@@ -73,13 +79,15 @@ class MpesaTools:
                     transaction_type,
                 )
                 # Return the response as a formatted JSON string
-                return json.dumps(response, indent=2)
+                with span("serialization"):
+                    return json.dumps(response, indent=2)
             except Exception as e:
                 # Handle any exceptions that occur and return an error message
                 return {"error": f"Failed to initiate STK push: {str(e)}"}
 
         # STK PUSH STATUS QUERY TOOL
         @self.mcp.tool()
+        @profile_tool
         async def stk_push_status(
             ctx: Context,
             checkout_request_id: str,
@@ -96,17 +104,19 @@ class MpesaTools:
                 Dict[str, Any]: A JSON object with transaction status including ResultCode and ResultDesc.
             """
             try:
-                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context
+                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context.providers[MpesaProvider.key]
 
                 response = await query_stk_push_status(
-                    mpesa_ctx.access_token, checkout_request_id
+                    mpesa_ctx.client, mpesa_ctx.access_token, checkout_request_id
                 )
-                return json.dumps(response, indent=2)
+                with span("serialization"):
+                    return json.dumps(response, indent=2)
             except Exception as e:
                 return {"error": f"Failed to query STK push status: {str(e)}"}
 
         # GENERATE QR CODE
         @self.mcp.tool()
+        @profile_tool
         async def generate_qr_code(
             ctx: Context,
             merchant_name: str,
@@ -149,7 +159,7 @@ class MpesaTools:
 
             """
             try:
-                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context
+                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context.providers[MpesaProvider.key]
 
                 payload = {
                     "MerchantName": merchant_name,
@@ -160,7 +170,7 @@ class MpesaTools:
                     "Size": size,
                 }
 
-                response = await generate_dynamic_qr(mpesa_ctx.access_token, payload)
+                response = await generate_dynamic_qr(mpesa_ctx.client, mpesa_ctx.access_token, payload)
                 return response
             except Exception as e:
                 return {"error": f"Failed to generate QR code: {str(e)}"}
@@ -168,6 +178,7 @@ class MpesaTools:
             
         #INITIATE CUSTOMER TO BUSINESS
         @self.mcp.tool()
+        @profile_tool
         async def c2b_payment(
             amount: int,
             account_number: str,
@@ -190,4 +201,61 @@ class MpesaTools:
                 return response
             except Exception as e:
                 return {"error": f"Failed to generate QR code: {str(e)}"}
-            
+
+        # REGISTER C2B CONFIRMATION AND VALIDATION URLS
+        @self.mcp.tool()
+        @profile_tool
+        async def c2b_register_urls(
+            ctx: Context,
+            response_type: str = "Completed",
+        ) -> Dict[str, Any]:
+            """
+            Registers the C2B confirmation and validation URLs with M-Pesa for the business shortcode.
+
+            This only needs to be done once per shortcode, or whenever the URLs change. After registration M-Pesa
+            notifies the server of every Paybill payment, which lets c2b_payment_status report payments automatically.
+
+            Args:
+                response_type (str, optional): Action M-Pesa takes if the validation URL cannot be reached,
+                    either "Completed" (accept the payment) or "Cancelled" (reject it). Default is "Completed".
+
+            Returns:
+                Dict[str, Any]: The registration response from M-Pesa, or an error message.
+            """
+            try:
+                mpesa_ctx: MPesaContext = ctx.request_context.lifespan_context.providers[MpesaProvider.key]
+
+                response = await register_c2b_urls(mpesa_ctx.client, mpesa_ctx.access_token, response_type)
+                return response
+            except Exception as e:
+                return {"error": f"Failed to register C2B URLs: {str(e)}"}
+
+        # C2B PAYMENT STATUS
+        @self.mcp.tool()
+        @profile_tool
+        async def c2b_payment_status(
+            account_number: str,
+            amount: int | None = None,
+        ) -> Dict[str, Any]:
+            """
+            Checks whether a customer has paid a C2B Paybill payment.
+
+            Payments requested with c2b_payment are matched against the confirmations M-Pesa sends to the server,
+            so the result is available immediately without checking statements.
+
+            Args:
+                account_number (str): The reference/account number the customer paid to.
+                amount (int, optional): Only report payments of this amount.
+
+            Returns:
+                Dict[str, Any]: A dictionary containing:
+                    - account_number (str): The normalized account number
+                    - status (str): "pending" (at least one expected payment not yet paid), "paid",
+                      "unmatched" (paid without a matching request) or "unknown"
+                    - counts (dict): Number of payments per status
+                    - payments (list): Every known payment for the account, with receipt details once paid
+            """
+            try:
+                return payment_matcher.status(account_number, amount)
+            except Exception as e:
+                return {"error": f"Failed to check C2B payment status: {str(e)}"}
@@ -5,10 +5,11 @@ import asyncio
 import time
 from dotenv import load_dotenv
 from src.servers.mpesa.models.context import MPesaContext
+from src.servers.adaptive_timeout import adaptive_timeout
 
 load_dotenv(override=True)
 
-async def get_access_token():
+async def get_access_token(client: httpx.AsyncClient):
     consumer_key = os.getenv("MPESA_CONSUMER_KEY")
     consumer_secret = os.getenv("MPESA_CONSUMER_SECRET")
     base_url = os.getenv("BASE_URL")
@@ -23,14 +24,15 @@ async def get_access_token():
     headers = {"Authorization": f"Basic {encoded_auth}"}
     params = {"grant_type": "client_credentials"}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return {
-            "access_token": data["access_token"],
-            "expires_in": int(data["expires_in"]),
-        }
+    response = await adaptive_timeout.request(
+        client, "GET", url, "oauth", idempotent=True, headers=headers, params=params
+    )
+    response.raise_for_status()
+    data = response.json()
+    return {
+        "access_token": data["access_token"],
+        "expires_in": int(data["expires_in"]),
+    }
 
 async def refresh_access_token(context: MPesaContext):
     while True:
@@ -38,7 +40,7 @@ async def refresh_access_token(context: MPesaContext):
         await asyncio.sleep(sleep_for)
         try:
             print("Refreshing M-Pesa access token...")
-            token_data = await get_access_token()
+            token_data = await get_access_token(context.client)
             context.access_token = token_data["access_token"]
             context.expires_at = time.time() + token_data["expires_in"]
         except Exception as e:
@@ -0,0 +1,87 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+import httpx
+
+
+@dataclass
+class PayLinkContext:
+    """Lifespan context holding the runtime context of every enabled provider"""
+    providers: Dict[str, Any] = field(default_factory=dict)
+
+
+class PaymentProvider(ABC):
+    """
+    Base class for payment provider plugins.
+
+    A provider owns everything specific to one payment network: the MCP tools it
+    exposes, the HTTP client used to reach its API, how it authenticates and how
+    its webhook callbacks are parsed.
+    """
+
+    # Unique key used in the registry and in the callback route (/{key}/callback)
+    key: str = ""
+
+    def __init__(self) -> None:
+        # Shared by every call to the provider's API so connections are pooled; created in start()
+        self.client: httpx.AsyncClient | None = None
+
+    @abstractmethod
+    def register_tools(self, mcp) -> None:
+        """
+        Registers the provider's tools with the MCP server.
+
+        Args:
+            mcp: The MCP server instance to register the tools with.
+        """
+
+    def register_routes(self, mcp) -> None:
+        """
+        Registers HTTP routes the provider needs besides /{key}/callback.
+
+        Args:
+            mcp: The MCP server instance to register the routes with.
+        """
+
+    @abstractmethod
+    async def authenticate(self) -> Any:
+        """
+        Authenticates against the provider and returns the provider's runtime context.
+
+        Returns:
+            Any: Context object made available to the provider's tools.
+        """
+
+    @abstractmethod
+    def parse_callback(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalizes a raw webhook payload sent by the provider.
+
+        Args:
+            payload (Dict[str, Any]): Decoded JSON body of the callback request.
+
+        Returns:
+            Dict[str, Any]: Provider independent view of the callback.
+        """
+
+    async def start(self) -> Any:
+        """
+        Starts the provider at application startup.
+
+        Returns:
+            Any: The provider's runtime context.
+        """
+        self.client = httpx.AsyncClient()
+        return await self.authenticate()
+
+    async def stop(self, context: Any) -> None:
+        """
+        Releases resources held by the provider at application shutdown.
+
+        Args:
+            context (Any): The context returned by start().
+        """
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
@@ -0,0 +1,58 @@
+import os
+import importlib
+import logging
+from typing import Dict, Iterable
+
+from src.servers.provider import PaymentProvider
+
+logger = logging.getLogger(__name__)
+
+# Provider key -> "module:ClassName". Modules are only imported when the provider
+# is enabled, so startup cost scales with enabled providers, not known ones.
+PROVIDERS: Dict[str, str] = {
+    "mpesa": "src.servers.mpesa.provider:MpesaProvider",
+}
+
+DEFAULT_PROVIDERS = "mpesa"
+
+
+class ProviderRegistry:
+    """Loads enabled providers and resolves them by key"""
+
+    def __init__(self, enabled: Iterable[str] | None = None) -> None:
+        if enabled is None:
+            enabled = os.getenv("PAYLINK_PROVIDERS", DEFAULT_PROVIDERS).split(",")
+
+        self._providers: Dict[str, PaymentProvider] = {}
+        for key in enabled:
+            key = key.strip().lower()
+            if key and key not in self._providers:
+                self._providers[key] = self._load(key)
+
+    @staticmethod
+    def _load(key: str) -> PaymentProvider:
+        target = PROVIDERS.get(key)
+        if target is None:
+            raise ValueError(f"Unknown payment provider: {key}")
+
+        module_name, class_name = target.split(":")
+        module = importlib.import_module(module_name)
+        logger.info(f"Loaded payment provider: {key}")
+        return getattr(module, class_name)()
+
+    def get(self, key: str) -> PaymentProvider | None:
+        """Returns the enabled provider registered under key, or None"""
+        return self._providers.get(key)
+
+    def items(self):
+        return self._providers.items()
+
+    def register_tools(self, mcp) -> None:
+        """Registers the tools of every enabled provider with the MCP server"""
+        for provider in self._providers.values():
+            provider.register_tools(mcp)
+
+    def register_routes(self, mcp) -> None:
+        """Registers the extra HTTP routes of every enabled provider with the MCP server"""
+        for provider in self._providers.values():
+            provider.register_routes(mcp)
@@ -7,6 +7,7 @@ from typing import Any, Callable
 from pymongo import MongoClient
 from dotenv import load_dotenv
 from pymongo.server_api import ServerApi
+from src.tracing.profiling import span
 
 load_dotenv(override=True)
 
@@ -46,7 +47,8 @@ def async_trace(func: Callable):
             }
         }
 
-        insert_result = trace_collection.insert_one(trace_log)
+        with span("tracing"):
+            insert_result = trace_collection.insert_one(trace_log)
         trace_id = insert_result.inserted_id
 
         try:
@@ -54,26 +56,28 @@ def async_trace(func: Callable):
 
             status = "error" if isinstance(result, dict) and "error" in result else "success"
 
-            trace_collection.update_one(
-                {"_id": trace_id},
-                {"$set": {
-                    "status": status,
-                    "duration": round(time.time() - start_time, 3),
-                    "timestamp": datetime.utcnow(),
-                    "result": result if isinstance(result, dict) else str(result),
-                }}
-            )
+            with span("tracing"):
+                trace_collection.update_one(
+                    {"_id": trace_id},
+                    {"$set": {
+                        "status": status,
+                        "duration": round(time.time() - start_time, 3),
+                        "timestamp": datetime.utcnow(),
+                        "result": result if isinstance(result, dict) else str(result),
+                    }}
+                )
             return result
         except Exception as e:
-            trace_collection.update_one(
-                {"_id": trace_id},
-                {"$set": {
-                    "status": "error",
-                    "duration": round(time.time() - start_time, 3),
-                    "error": str(e),
-                    "timestamp": datetime.utcnow(),
-                }}
-            )
+            with span("tracing"):
+                trace_collection.update_one(
+                    {"_id": trace_id},
+                    {"$set": {
+                        "status": "error",
+                        "duration": round(time.time() - start_time, 3),
+                        "error": str(e),
+                        "timestamp": datetime.utcnow(),
+                    }}
+                )
             raise
 
     return wrapper
@@ -0,0 +1,21 @@
+import os
+from typing import Any, Dict
+from dotenv import load_dotenv
+from src.tracing.logger import logger
+
+load_dotenv(override=True)
+
+# Writing every callback to the trace log costs a file write on the callback path, so it is opt-in
+RECORD_CALLBACKS = os.getenv("PAYLINK_RECORD_CALLBACKS", "false").lower() == "true"
+
+
+def record_callback(path: str, payload: Dict[str, Any]) -> None:
+    """
+    Writes a received callback to the trace log so it can be replayed with callback_replay.py.
+
+    Args:
+        path (str): Route the callback was received on (e.g. /mpesa/callback).
+        payload (Dict[str, Any]): Decoded JSON body of the callback.
+    """
+    if RECORD_CALLBACKS:
+        logger.info("Callback received", extra={"path": path, "payload": payload})
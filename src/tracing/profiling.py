@@ -0,0 +1,286 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import functools
+import threading
+import traceback
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict
+from dotenv import load_dotenv
+
+from src.tracing.logger import logger
+
+load_dotenv(override=True)
+
+
+class Invocation:
+    """Profile of a single tool invocation"""
+
+    __slots__ = ("function", "spans", "samples")
+
+    def __init__(self, function: str) -> None:
+        self.function = function
+        self.spans: Dict[str, float] = {}
+        self.samples: Counter = Counter()
+
+
+# Set only while a tool runs with profiling enabled; spans and CPU samples are
+# attributed to the invocation of the context they happen in.
+_invocation: ContextVar[Invocation | None] = ContextVar("paylink_invocation", default=None)
+
+
+class _Span:
+    __slots__ = ("invocation", "name", "start_time")
+
+    def __init__(self, invocation: Invocation, name: str) -> None:
+        self.invocation = invocation
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = self.invocation.spans
+        spans[self.name] = spans.get(self.name, 0.0) + time.perf_counter() - self.start_time
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    """
+    Times a phase of the current tool invocation (e.g. "validation", "upstream", "tracing").
+
+    Outside a profiled invocation this returns a shared no-op context manager.
+    """
+    invocation = _invocation.get()
+    if invocation is None:
+        return _NOOP_SPAN
+    return _Span(invocation, name)
+
+
+class Profiler:
+    """
+    Opt-in profiling for tool invocations and the event loop.
+
+    - Phase spans: time spent in each span() of a tool invocation.
+    - CPU sampling: a SIGPROF timer samples the running stack every cpu_interval seconds
+      of CPU time. Samples are attributed to the tool invocation whose context is running.
+    - Event loop lag: a heartbeat callback is scheduled on the loop and a watchdog thread
+      logs the loop thread's stack whenever the heartbeat is late by more than
+      slow_callback seconds.
+
+    Enabled at startup with PAYLINK_PROFILING=true, or at runtime through the
+    /debug/profiling route (only served when PAYLINK_PROFILING_TOKEN is set).
+    When disabled, profile_tool and span only check a flag.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.cpu_interval = float(os.getenv("PAYLINK_PROFILING_CPU_INTERVAL", "0.005"))
+        self.slow_callback = float(os.getenv("PAYLINK_SLOW_CALLBACK_MS", "100")) / 1000
+        self.reports: deque = deque(maxlen=50)
+
+        self._cpu_sampling = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._loop_lag_pending = False
+        self._beat_handle: asyncio.TimerHandle | None = None
+        self._heartbeat = 0.0
+        self._max_lag = 0.0
+        self._watchdog: threading.Thread | None = None
+        self._stop_watchdog: threading.Event | None = None
+
+    def enable(self, cpu: bool = True, loop_lag: bool = True) -> None:
+        """Turns profiling on. Call from the main thread; the loop watchdog starts once a loop runs."""
+        self.enabled = True
+        if cpu:
+            self._start_cpu_sampling()
+        else:
+            self._stop_cpu_sampling()
+
+        if loop_lag:
+            try:
+                self._start_loop_watchdog()
+            except RuntimeError:
+                # No running loop yet, started by the first profiled tool call
+                self._loop_lag_pending = True
+        else:
+            self._stop_loop_watchdog()
+
+    def disable(self) -> None:
+        """Turns profiling off and stops the CPU sampler and loop watchdog"""
+        self.enabled = False
+        self._stop_cpu_sampling()
+        self._stop_loop_watchdog()
+
+    def reset_loop_lag(self) -> None:
+        """Starts a new window for the max_loop_lag reported by status()"""
+        self._max_lag = 0.0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "cpu_sampling": self._cpu_sampling,
+            "loop_lag": self._watchdog is not None,
+            "max_loop_lag": round(self._max_lag, 4),
+            "reports": list(self.reports),
+        }
+
+    # CPU sampling
+
+    def _start_cpu_sampling(self) -> None:
+        if self._cpu_sampling or not hasattr(signal, "setitimer"):
+            return
+        try:
+            signal.signal(signal.SIGPROF, self._sample)
+        except ValueError:
+            # Signal handlers can only be installed from the main thread
+            logger.warning("CPU sampling unavailable outside the main thread")
+            return
+        signal.setitimer(signal.ITIMER_PROF, self.cpu_interval, self.cpu_interval)
+        self._cpu_sampling = True
+
+    def _stop_cpu_sampling(self) -> None:
+        if not self._cpu_sampling:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        self._cpu_sampling = False
+
+    @staticmethod
+    def _sample(signum, frame) -> None:
+        invocation = _invocation.get()
+        if invocation is None or frame is None:
+            return
+
+        stack = []
+        while frame is not None and len(stack) < 10:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        invocation.samples[" <- ".join(stack)] += 1
+
+    # Event loop lag
+
+    def _start_loop_watchdog(self) -> None:
+        if self._watchdog is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._max_lag = 0.0
+        self._beat_handle = self._loop.call_soon(self._beat)
+        self._loop_lag_pending = False
+
+        # Each watchdog gets its own stop event, so a stopping thread can never be revived by a restart
+        self._stop_watchdog = threading.Event()
+        self._watchdog = threading.Thread(
+            target=self._watch, args=(self._stop_watchdog,), name="paylink-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def _stop_loop_watchdog(self) -> None:
+        self._loop_lag_pending = False
+        if self._watchdog is None:
+            return
+        self._beat_handle.cancel()
+        # Only signal the thread: joining it here would block the loop this watchdog is meant to protect
+        self._stop_watchdog.set()
+        self._watchdog = None
+
+    def _beat(self) -> None:
+        now = time.monotonic()
+        # Delay beyond the scheduled interval is time the loop was blocked
+        lag = now - self._heartbeat - self.slow_callback / 2
+        self._max_lag = max(self._max_lag, lag)
+        self._heartbeat = now
+        self._beat_handle = self._loop.call_later(self.slow_callback / 2, self._beat)
+
+    def _watch(self, stop: threading.Event) -> None:
+        stalled_at = None
+        while not stop.wait(self.slow_callback / 2):
+            heartbeat = self._heartbeat
+
+            if stalled_at is not None and heartbeat != stalled_at:
+                # The loop resumed: report the full stall, i.e. the gap between heartbeats
+                # (accurate to one heartbeat interval, slow_callback / 2)
+                logger.warning(
+                    "Event loop unblocked",
+                    extra={"blocked_for": round(heartbeat - stalled_at, 4)},
+                )
+                stalled_at = None
+
+            blocked_for = time.monotonic() - heartbeat
+            if blocked_for < self.slow_callback or heartbeat == stalled_at:
+                continue
+
+            # Report each stall when it is noticed, with the stack the loop is stuck in
+            stalled_at = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            logger.warning(
+                "Event loop blocked",
+                extra={"blocked_for": round(blocked_for, 4), "stack": stack},
+            )
+
+    # Tool invocations
+
+    def _report(self, invocation: Invocation, duration: float) -> None:
+        report = {
+            "function": invocation.function,
+            "duration": round(duration, 4),
+            "spans": {name: round(seconds, 4) for name, seconds in invocation.spans.items()},
+            "cpu_samples": sum(invocation.samples.values()),
+            "top_stacks": [
+                {"stack": stack, "samples": count}
+                for stack, count in invocation.samples.most_common(5)
+            ],
+        }
+        self.reports.append(report)
+        logger.info("Tool profile", extra=report)
+
+
+profiler = Profiler()
+
+if os.getenv("PAYLINK_PROFILING", "false").lower() == "true":
+    profiler.enable()
+
+
+def profile_tool(func: Callable):
+    """Profiles a tool invocation when profiling is enabled"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> Any:
+        if not profiler.enabled:
+            return await func(*args, **kwargs)
+
+        if profiler._loop_lag_pending:
+            profiler._start_loop_watchdog()
+
+        invocation = Invocation(func.__name__)
+        token = _invocation.set(invocation)
+        start_time = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _invocation.reset(token)
+            profiler._report(invocation, time.perf_counter() - start_time)
+
+    return wrapper